@@ -3,37 +3,169 @@ import sys
 import subprocess
 import time
 import json
+import html
 import webview
 import logging
+import queue
+import atexit
+import tempfile
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from threading import Thread
+from threading import Thread, Timer, Lock
 import psutil
+import orjson
 import requests
-import re
+from requests.adapters import HTTPAdapter
 
-# Настройка логирования
+# Настройка логирования: запись в файл и консоль идет в фоновом потоке,
+# чтобы вызовы logger не блокировали поток интерфейса и запуска на диске
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [
+    logging.FileHandler('arizona_launcher.log'),
+    logging.StreamHandler()
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, *_log_handlers)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('arizona_launcher.log'),
-        logging.StreamHandler()
-    ]
+    format='%(message)s',
+    handlers=[QueueHandler(_log_queue)]
 )
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
+# Общая HTTP-сессия: повторные запросы списка серверов переиспользуют соединение
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+# WinAPI для быстрого поиска процессов лаунчера без сбора лишних данных psutil
+if sys.platform == 'win32':
+    import ctypes
+    from ctypes import wintypes
+    
+    PROCESS_TERMINATE = 0x0001
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    
+    _kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    _psapi = ctypes.WinDLL('psapi', use_last_error=True)
+    
+    _psapi.EnumProcesses.argtypes = [ctypes.POINTER(wintypes.DWORD), wintypes.DWORD, ctypes.POINTER(wintypes.DWORD)]
+    _psapi.EnumProcesses.restype = wintypes.BOOL
+    _kernel32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    _kernel32.OpenProcess.restype = wintypes.HANDLE
+    _kernel32.QueryFullProcessImageNameW.argtypes = [wintypes.HANDLE, wintypes.DWORD, wintypes.LPWSTR, ctypes.POINTER(wintypes.DWORD)]
+    _kernel32.QueryFullProcessImageNameW.restype = wintypes.BOOL
+    _kernel32.TerminateProcess.argtypes = [wintypes.HANDLE, wintypes.UINT]
+    _kernel32.TerminateProcess.restype = wintypes.BOOL
+    _kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    _kernel32.CloseHandle.restype = wintypes.BOOL
+
+def _enum_pids_win32():
+    """Возвращает список PID всех процессов через EnumProcesses"""
+    size = 4096
+    while True:
+        pids = (wintypes.DWORD * size)()
+        returned = wintypes.DWORD()
+        if not _psapi.EnumProcesses(pids, ctypes.sizeof(pids), ctypes.byref(returned)):
+            raise ctypes.WinError(ctypes.get_last_error())
+        count = returned.value // ctypes.sizeof(wintypes.DWORD)
+        # Буфер заполнен целиком - список мог не поместиться
+        if count < size:
+            return pids[:count]
+        size *= 2
+
+def _kill_processes_win32(name_part):
+    """Завершает процессы, в имени образа которых есть name_part, и возвращает их PID"""
+    killed = []
+    buf = ctypes.create_unicode_buffer(32768)
+    for pid in _enum_pids_win32():
+        if not pid:
+            continue
+        handle = _kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION | PROCESS_TERMINATE, False, pid)
+        # Нет доступа или процесс уже завершился
+        if not handle:
+            continue
+        try:
+            length = wintypes.DWORD(len(buf))
+            if not _kernel32.QueryFullProcessImageNameW(handle, 0, buf, ctypes.byref(length)):
+                continue
+            name = os.path.basename(buf.value)
+            if name_part in name.lower():
+                logger.info(f"Завершаем процесс: {name} (PID: {pid})")
+                if _kernel32.TerminateProcess(handle, 1):
+                    killed.append(pid)
+        finally:
+            _kernel32.CloseHandle(handle)
+    return killed
+
+def _strip_line_comments(buf):
+    """Удаляет строки-комментарии // и пустые строки"""
+    # Внутри JSON-строки перевод строки недопустим, поэтому строка,
+    # начинающаяся с //, всегда является комментарием
+    return b'\n'.join(
+        line for line in buf.split(b'\n')
+        if (stripped := line.strip()) and not stripped.startswith(b'//')
+    )
+
+def _indent4(buf):
+    """Удваивает отступы orjson (2 пробела) до 4, как у прежнего json.dump(indent=4)"""
+    # Переводы строк внутри JSON-строк экранированы, поэтому ведущие
+    # пробелы каждой строки - это всегда отступ. Совпадает только разметка:
+    # числа с плавающей точкой orjson пишет иначе (1e16, а не 1e+16)
+    return b'\n'.join(
+        b' ' * (len(line) - len(line.lstrip(b' '))) + line
+        for line in buf.split(b'\n')
+    )
+
+def _write_atomic(path, data):
+    """Записывает файл через временный файл и os.replace, чтобы не оставить его обрезанным"""
+    # Уникальное имя в той же папке: параллельные записи не делят один временный файл
+    with tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(path) or '.',
+        prefix=os.path.basename(path) + '.',
+        suffix='.tmp',
+        delete=False
+    ) as f:
+        tmp_path = f.name
+        try:
+            f.write(data)
+        except Exception:
+            f.close()
+            os.remove(tmp_path)
+            raise
+    try:
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
 class ArizonaLauncher:
     def __init__(self):
         # ~ автоматически заменится на домашнюю директорию пользователя
         self.launcher_path = os.path.expanduser(
             r"~\AppData\Local\Programs\Arizona Games Launcher\bin\arizona\ArizonaLauncher6_byAIR.exe"
         )
+        self._launcher_cwd = os.path.dirname(self.launcher_path)
+        # Результат проверки наличия лаунчера (кэшируется только найденный)
+        self._launcher_exists = None
         
         self.patches_path = os.path.expanduser(
             r"~\AppData\Local\Programs\Arizona Games Launcher\bin\arizona\preloading_plugins\#ArizonaPatches.json"
         )
         
         self.config = self.load_config()
+        # Отложенная запись конфига: серия изменений сохраняется одной записью
+        self._config_lock = Lock()
+        self._config_timer = None
+        self._config_dirty = False
+        atexit.register(self.flush_config)
+        
+        # Кэш разобранного ArizonaPatches.json: (mtime_ns, size, data)
+        self._patches_cache = (None, None, None)
         
         logger.info(f"Инициализирован лаунчер. Путь: {self.launcher_path}")
     
@@ -42,39 +174,74 @@ class ArizonaLauncher:
         config_path = Path('config.json')
         if config_path.exists():
             try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                with open(config_path, 'rb') as f:
+                    return orjson.loads(f.read())
             except Exception as e:
                 logger.error(f"Ошибка загрузки конфига: {e}")
         return {}
     
     def save_config(self):
+        """Планирует сохранение конфигурации (не чаще раза в секунду)"""
+        with self._config_lock:
+            self._config_dirty = True
+            if self._config_timer is None:
+                self._config_timer = Timer(1.0, self.flush_config)
+                self._config_timer.daemon = True
+                self._config_timer.start()
+    
+    def flush_config(self):
         """Сохраняет конфигурацию в файл"""
-        try:
-            with open('config.json', 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
-            logger.info("Конфигурация сохранена")
-        except Exception as e:
-            logger.error(f"Ошибка сохранения конфига: {e}")
+        with self._config_lock:
+            if self._config_timer is not None:
+                self._config_timer.cancel()
+                self._config_timer = None
+            if not self._config_dirty:
+                return
+            self._config_dirty = False
+            # Пишем под той же блокировкой, чтобы запись из таймера и из atexit
+            # не пересекались и старый снимок не перезаписал новый
+            try:
+                _write_atomic('config.json', orjson.dumps(self.config, option=orjson.OPT_INDENT_2))
+                logger.info("Конфигурация сохранена")
+            except Exception as e:
+                logger.error(f"Ошибка сохранения конфига: {e}")
     
     def is_launcher_available(self):
         """Проверяет, существует ли файл лаунчера"""
+        if self._launcher_exists:
+            return True
         if not os.path.exists(self.launcher_path):
             logger.error(f"Файл лаунчера не найден: {self.launcher_path}")
             return False
+        self._launcher_exists = True
         return True
     
     def kill_all_launchers(self):
         """Убивает все запущенные процессы лаунчера"""
         try:
-            for proc in psutil.process_iter(['pid', 'name']):
-                try:
-                    if 'arizonalauncher' in proc.info['name'].lower():
-                        logger.info(f"Завершаем процесс: {proc.info['name']} (PID: {proc.info['pid']})")
-                        proc.kill()
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    pass
-            time.sleep(1)
+            if sys.platform == 'win32':
+                # На Windows достаточно имени образа - идем напрямую через WinAPI
+                killed = _kill_processes_win32('arizonalauncher')
+            else:
+                killed = []
+                # Обходим PID напрямую и спрашиваем только имя: process_iter
+                # в psutil < 6.0 дополнительно проверяет каждый PID на повторное использование
+                for pid in psutil.pids():
+                    try:
+                        proc = psutil.Process(pid)
+                        name = proc.name()
+                        if 'arizonalauncher' in name.lower():
+                            logger.info(f"Завершаем процесс: {name} (PID: {pid})")
+                            proc.kill()
+                            killed.append(pid)
+                    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                        pass
+            
+            # Ждем, пока завершенные процессы исчезнут, но не дольше 0.5 с
+            deadline = time.monotonic() + 0.5
+            while killed and time.monotonic() < deadline:
+                time.sleep(0.05)
+                killed = [pid for pid in killed if psutil.pid_exists(pid)]
         except Exception as e:
             logger.error(f"Ошибка при завершении процессов: {e}")
     
@@ -88,13 +255,10 @@ class ArizonaLauncher:
                 return {"success": False, "message": f"Лаунчер не найден: {self.launcher_path}"}
             
             # Валидация никнейма
-            if not nickname or len(nickname.strip()) == 0:
+            nickname = (nickname or '').strip()[:20]
+            if not nickname:
                 return {"success": False, "message": "Введите никнейм"}
             
-            nickname = nickname.strip()
-            if len(nickname) > 20:
-                nickname = nickname[:20]
-            
             # Параметры по умолчанию
             server_ip = "payson.arizona-rp.com"
             server_port = 7777
@@ -118,25 +282,28 @@ class ArizonaLauncher:
                 "-cdn", "1,1,1"
             ]
             
-            logger.info(f"Команда запуска: {' '.join(cmd)}")
+            logger.info("Команда запуска: %s", cmd)
             
             # Запускаем процесс
             try:
                 # Сначала убиваем все старые процессы
                 self.kill_all_launchers()
-                time.sleep(1)
                 
                 # Запускаем новый процесс
                 process = subprocess.Popen(
                     cmd,
-                    cwd=os.path.dirname(self.launcher_path),
+                    cwd=self._launcher_cwd,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
                     creationflags=subprocess.CREATE_NO_WINDOW
                 )
                 
-                # Даем время на запуск
-                time.sleep(2)
+                # Ждем на дескрипторе процесса: если он завершится сразу - это ошибка,
+                # иначе по таймауту считаем, что лаунчер запустился
+                try:
+                    process.wait(timeout=0.25)
+                except subprocess.TimeoutExpired:
+                    pass
                 
                 # Проверяем, запустился ли процесс
                 if process.poll() is None:
@@ -161,6 +328,8 @@ class ArizonaLauncher:
                     return {"success": False, "message": f"Ошибка запуска: {error_msg[:100]}"}
                     
             except Exception as e:
+                # Лаунчер мог быть удален - при следующем запуске проверим заново
+                self._launcher_exists = None
                 logger.error(f"Исключение при запуске процесса: {e}")
                 return {"success": False, "message": f"Ошибка запуска: {str(e)}"}
                 
@@ -172,22 +341,27 @@ class ArizonaLauncher:
     def read_patches(self):
         """Читает файл ArizonaPatches.json, удаляя комментарии"""
         try:
-            if not os.path.exists(self.patches_path):
+            try:
+                st = os.stat(self.patches_path)
+            except FileNotFoundError:
                 logger.error(f"Файл ArizonaPatches.json не найден: {self.patches_path}")
                 return {"success": False, "message": "Файл не найден"}
             
-            with open(self.patches_path, 'r', encoding='utf-8') as f:
+            # Файл не менялся с прошлого чтения - отдаем данные из кэша
+            if (st.st_mtime_ns, st.st_size) == self._patches_cache[:2]:
+                return self._patches_cache[2]
+            
+            with open(self.patches_path, 'rb') as f:
                 content = f.read()
             
-            # Удаляем однострочные комментарии //
-            content_no_comments = re.sub(r'^\s*//.*$', '', content, flags=re.MULTILINE)
-            # Удаляем пустые строки и лишние пробелы
-            content_no_comments = '\n'.join(line for line in content_no_comments.split('\n') if line.strip())
+            # Удаляем однострочные комментарии // и пустые строки
+            content_no_comments = _strip_line_comments(content)
             
-            data = json.loads(content_no_comments)
+            data = orjson.loads(content_no_comments)
+            self._patches_cache = (st.st_mtime_ns, st.st_size, data)
             logger.info("ArizonaPatches.json успешно прочитан")
             return data
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Ошибка парсинга JSON после удаления комментариев: {e}")
             return {"success": False, "message": f"Ошибка парсинга: {str(e)}"}
         except Exception as e:
@@ -197,8 +371,10 @@ class ArizonaLauncher:
     def write_patches(self, data):
         """Записывает изменения в ArizonaPatches.json"""
         try:
-            with open(self.patches_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            buf = _indent4(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            _write_atomic(self.patches_path, buf)
+            st = os.stat(self.patches_path)
+            self._patches_cache = (st.st_mtime_ns, st.st_size, data)
             logger.info("ArizonaPatches.json успешно обновлен")
             return {"success": True, "message": "Настройки сохранены"}
         except Exception as e:
@@ -208,6 +384,9 @@ class ArizonaLauncher:
 class WebViewApp:
     def __init__(self):
         self.launcher = ArizonaLauncher()
+        # Последний список серверов и заголовки для условного запроса к API
+        self._servers_cache = None
+        self._servers_validators = {}
         logger.info("WebViewApp инициализирован")
     
     def start_game(self, nickname, server_data=None):
@@ -221,6 +400,8 @@ class WebViewApp:
                 logger.info(f"Результат запуска: {result}")
             except Exception as e:
                 logger.error(f"Ошибка в потоке запуска: {e}")
+                result = {"success": False, "message": f"Ошибка запуска: {e}"}
+            self._notify_launch_result(result)
         
         thread = Thread(target=run_in_thread)
         thread.daemon = True
@@ -228,6 +409,19 @@ class WebViewApp:
         
         return {"success": True, "message": "Запуск начат...", "status": "processing"}
     
+    def _notify_launch_result(self, result):
+        """Показывает результат запуска в интерфейсе"""
+        if not webview.windows:
+            return
+        # showNotification вставляет текст через innerHTML, а в сообщении
+        # бывают никнейм и stderr лаунчера - экранируем HTML
+        message = json.dumps(html.escape(str(result.get('message', ''))))
+        kind = json.dumps('success' if result.get('success') else 'error')
+        try:
+            webview.windows[0].evaluate_js(f"showNotification({message}, {kind})")
+        except Exception as e:
+            logger.error(f"Ошибка отправки результата в интерфейс: {e}")
+    
     def get_config(self):
         """Возвращает текущую конфигурацию"""
         return {
@@ -245,65 +439,73 @@ class WebViewApp:
     def get_servers(self):
         """Загружает список серверов с API"""
         try:
-            logger.info("=== НАЧАЛО ЗАГРУЗКИ СЕРВЕРОВ ===")
+            logger.debug("=== НАЧАЛО ЗАГРУЗКИ СЕРВЕРОВ ===")
             url = "https://arizona-ping.react.group/desktop/ping/Arizona/ping.json"
-            logger.info(f"URL API: {url}")
+            logger.debug("URL API: %s", url)
             
-            logger.info("Отправка запроса...")
-            response = requests.get(url, timeout=10)
-            logger.info(f"Код ответа: {response.status_code}")
+            logger.debug("Отправка запроса...")
+            headers = self._servers_validators if self._servers_cache is not None else None
+            response = _SESSION.get(url, headers=headers, timeout=(3, 7))
+            logger.debug("Код ответа: %d", response.status_code)
+            
+            # Список не изменился - не скачиваем и не парсим его заново
+            if response.status_code == 304 and self._servers_cache is not None:
+                logger.debug("Список серверов не изменился, используем кэш")
+                return self._servers_cache
             
             if response.status_code != 200:
-                logger.error(f"Неуспешный код ответа: {response.status_code}")
-                logger.error(f"Текст ответа: {response.text[:200]}")
+                logger.error("Неуспешный код ответа: %d", response.status_code)
+                logger.error("Текст ответа: %s", response.text[:200])
                 return None
             
-            logger.info("Парсинг JSON...")
-            data = response.json()
-            logger.info(f"Тип данных: {type(data)}")
-            logger.info(f"Количество записей в JSON: {len(data)}")
+            logger.debug("Парсинг JSON...")
+            data = orjson.loads(response.content)
+            logger.debug("Тип данных: %s", type(data))
+            logger.debug("Количество записей в JSON: %d", len(data))
             
             # API возвращает массив серверов в ключе 'query'
             if 'query' in data and isinstance(data['query'], list):
-                logger.info(f"Формат API: массив в ключе 'query'")
+                logger.debug("Формат API: массив в ключе 'query'")
                 server_list = data['query']
             elif isinstance(data, list):
-                logger.info(f"Формат API: прямой массив")
+                logger.debug("Формат API: прямой массив")
                 server_list = data
             elif isinstance(data, dict):
-                logger.info(f"Формат API: объект с ключами")
+                logger.debug("Формат API: объект с ключами")
                 server_list = list(data.values())
             else:
-                logger.error(f"Неизвестный формат данных: {type(data)}")
+                logger.error("Неизвестный формат данных: %s", type(data))
                 return None
             
-            logger.info(f"Количество серверов в списке: {len(server_list)}")
+            logger.debug("Количество серверов в списке: %d", len(server_list))
             
             # Показываем первый сервер для примера
             if server_list:
-                logger.info(f"Пример первого сервера: {server_list[0]}")
+                logger.debug("Пример первого сервера: %s", server_list[0])
             
             # Преобразуем в нужный формат
             servers = []
+            append = servers.append
             for idx, server in enumerate(server_list):
                 try:
                     # Проверяем что это словарь
                     if not isinstance(server, dict):
-                        logger.warning(f"Сервер {idx} не является словарем: {type(server)}")
+                        logger.warning("Сервер %d не является словарем: %s", idx, type(server))
                         continue
                     
-                    server_id = server.get('number') or server.get('serverNumber') or server.get('id', idx + 1)
-                    server_name = server.get('name', f'Server {server_id}')
-                    server_online = server.get('online') or server.get('playersOnline', 0)
-                    server_queue = server.get('queue') or server.get('queueLength', 0)
-                    server_max = server.get('maxplayers') or server.get('maxPlayers') or server.get('maxonline', 1000)
-                    server_ip = server.get('ip', f'server{server_id}.arizona-rp.com')
-                    server_port = server.get('port', 7777)
+                    get = server.get
+                    server_id = get('number') or get('serverNumber') or get('id', idx + 1)
+                    server_name = get('name', f'Server {server_id}')
+                    server_online = get('online') or get('playersOnline', 0)
+                    server_queue = get('queue') or get('queueLength', 0)
+                    server_max = get('maxplayers') or get('maxPlayers') or get('maxonline', 1000)
+                    server_ip = get('ip', f'server{server_id}.arizona-rp.com')
+                    server_port = get('port', 7777)
                     
                     # Рекомендованные серверы
-                    is_recommended = server.get('recomend', False) or server.get('recommended', False) or (server_online > 400 and server_queue == 0)
+                    is_recommended = bool(get('recomend') or get('recommended')) | ((server_online > 400) & (server_queue == 0))
                     
-                    servers.append({
+                    append({
                         'number': server_id,
                         'name': server_name,
                         'online': server_online,
@@ -314,41 +516,46 @@ class WebViewApp:
                         'maxplayers': server_max
                     })
                 except Exception as parse_error:
-                    logger.error(f"Ошибка парсинга сервера {idx}: {parse_error}")
+                    logger.error("Ошибка парсинга сервера %d: %s", idx, parse_error)
                     continue
             
-            logger.info(f"✅ Успешно обработано серверов: {len(servers)}")
+            logger.info("✅ Успешно обработано серверов: %d", len(servers))
             
-            if servers:
+            if servers and logger.isEnabledFor(logging.DEBUG):
                 # Показываем первые 3 для проверки
                 for i, s in enumerate(servers[:3]):
-                    logger.info(f"  Сервер {i+1}: {s['name']} - {s['online']} онлайн")
+                    logger.debug("  Сервер %d: %s - %s онлайн", i + 1, s['name'], s['online'])
+            
+            self._servers_cache = servers
+            self._servers_validators = {}
+            if 'ETag' in response.headers:
+                self._servers_validators['If-None-Match'] = response.headers['ETag']
+            if 'Last-Modified' in response.headers:
+                self._servers_validators['If-Modified-Since'] = response.headers['Last-Modified']
             
-            logger.info("=== КОНЕЦ ЗАГРУЗКИ СЕРВЕРОВ ===")
+            logger.debug("=== КОНЕЦ ЗАГРУЗКИ СЕРВЕРОВ ===")
             return servers
             
         except ImportError as e:
-            logger.error(f"❌ Модуль requests не установлен: {e}")
+            logger.error("❌ Модуль requests не установлен: %s", e)
             logger.error("Установите: pip install requests")
             return None
         except requests.exceptions.Timeout as e:
-            logger.error(f"❌ Таймаут запроса: {e}")
+            logger.error("❌ Таймаут запроса: %s", e)
             return None
         except requests.exceptions.ConnectionError as e:
-            logger.error(f"❌ Ошибка подключения: {e}")
+            logger.error("❌ Ошибка подключения: %s", e)
             logger.error("Проверьте интернет соединение")
             return None
         except requests.exceptions.RequestException as e:
-            logger.error(f"❌ Ошибка HTTP запроса: {e}")
+            logger.error("❌ Ошибка HTTP запроса: %s", e)
             return None
         except ValueError as e:
-            logger.error(f"❌ Ошибка парсинга JSON: {e}")
-            logger.error(f"Ответ сервера: {response.text[:500]}")
+            logger.error("❌ Ошибка парсинга JSON: %s", e)
+            logger.error("Ответ сервера: %s", response.text[:500])
             return None
         except Exception as e:
-            logger.error(f"❌ Неожиданная ошибка: {type(e).__name__}: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.error("❌ Неожиданная ошибка: %s: %s", type(e).__name__, e, exc_info=True)
             return None
     
     def read_patches(self):